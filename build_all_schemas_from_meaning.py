@@ -9,14 +9,82 @@ Types: num, string, date, boolean, binary (only these five; inferred from real m
 import json
 import csv
 import re
+from operator import itemgetter
+
+# Use orjson for loading the column-meaning JSON when available (optional)
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
 INPUT_PATH = "train_column_meaning.json"
 OUTPUT_PATH = "all_databases_schema.csv"
 
+# Patterns used by infer_column_type, compiled once at import.
+# Consecutive rules of the cascade that yield the same type are fused into one
+# alternation, so each run costs a single scan while keeping the rule priority.
+# Each search is guarded by a plain substring test for a literal every match must
+# contain, so the regex engine only runs on descriptions that can match.
+_RE_BOOL_FOR_MEANS = re.compile(
+    r"1 for .+ 0 for|0 for .+ 1 for|where 0 means .+ 1 means|where 1 means .+ 0 means"
+)
+_RE_BOOL_DIGIT = re.compile(r"\(1\)|\(0\)| 1 | 0 ")
+_RE_BOOL_TWO_VALUES = re.compile(r"possible values being '[^']+' or '[^']+'\"?")
+_RE_DATE = re.compile(
+    r"\b(?:date|timestamp|datetime)\s+(?:column|value|format|when)"
+    r"|formatted as (?:text )?strings?.*\d{4}-\d{2}-\d{2}"
+    r"|dates? indicating when"
+)
+_RE_NUM = re.compile(r"\b(?:integer|real)\b")
+_RE_TEXT = re.compile(r"\btext\b")
+
+# Date phrases grouped under an anchor substring that each of them contains, forming
+# a two-level trie: a group's phrases are only tested when its anchor is present.
+# Phrases implied by a shorter one in the same group (e.g. "utc datetime" by
+# "datetime") are omitted.
+_DATE_LITERALS = (
+    (
+        "date",
+        (
+            "date when",
+            "datetime",
+            "date and time",
+            "date a list",
+            "records the date",
+            "formatted as a date",
+            "formatted as date",
+            "specific date",
+            "stores dates",
+            "dates as text",
+            "text-formatted dates",
+            "of type date",
+            "type: date",
+        ),
+    ),
+    ("yyyy", ("yyyy-mm-dd",)),
+    ("timestamp", ("timestamp",)),
+    ("when ", ("when each list was", "when a user submitted")),
+)
+
+
+def _contains_date_literal(d: str) -> bool:
+    """True if d contains any of the date phrases in _DATE_LITERALS."""
+    for anchor, phrases in _DATE_LITERALS:
+        if anchor in d:
+            for phrase in phrases:
+                if phrase in d:
+                    return True
+    return False
+
 
 def infer_column_type(description: str) -> str:
     """Infer column type from description. Returns: num, string, date, boolean, or binary."""
-    d = description.lower()
+    return _infer_column_type_lower(description.lower())
+
+
+def _infer_column_type_lower(d: str) -> str:
+    """infer_column_type on an already lowercased description."""
     # string (early checks)
     if "text critique" in d or "critiques" in d or ("critic" in d and "text" in d):
         return "string"
@@ -32,13 +100,11 @@ def infer_column_type(description: str) -> str:
         return "boolean"
     if " (1) or not (0)" in d or "(1) or not (0)" in d or " or not (0)" in d or "(1) or not " in d:
         return "boolean"
-    if re.search(r"1 for .+ 0 for|0 for .+ 1 for", d) or re.search(r"where 0 means .+ 1 means|where 1 means .+ 0 means", d):
+    if ("for " in d or "means" in d) and _RE_BOOL_FOR_MEANS.search(d):
         return "boolean"
-    if re.search(r"0 for .+ 1 for|1 for .+ 0 for", d):
+    if "indicates if " in d and _RE_BOOL_DIGIT.search(d) and (" or not " in d or " or 0 " in d or " or 1 " in d):
         return "boolean"
-    if "indicates if " in d and re.search(r"\(1\)|\(0\)| 1 | 0 ", d) and (" or not " in d or " or 0 " in d or " or 1 " in d):
-        return "boolean"
-    if "indicates whether" in d and re.search(r"possible values being '[^']+' or '[^']+'\"?", d) and d.count(" or ") == 1 and d.count("'") == 4:
+    if "indicates whether" in d and _RE_BOOL_TWO_VALUES.search(d) and d.count(" or ") == 1 and d.count("'") == 4:
         return "boolean"
     if "possible values being 'male' or 'female'" in d or "possible values being 'female' or 'male'" in d:
         return "boolean"
@@ -73,46 +139,12 @@ def infer_column_type(description: str) -> str:
     if ("subscriber" in d or "trialist" in d or "payment" in d or "has_payment" in d) and ("(1)" in d or " 1 " in d) and ("(0)" in d or " 0 " in d or "or not" in d):
         return "boolean"
     # date / timestamp (check before num so "ranging from" in date descriptions doesn't become num)
-    if any(
-        x in d
-        for x in (
-            "date when",
-            "yyyy-mm-dd",
-            "timestamp",
-            "datetime",
-            "date and time",
-            "date a list",
-            "records the date",
-            "formatted as 'yyyy-mm-dd",
-            "formatted as yyyy-mm-dd",
-            "formatted as a date",
-            "formatted as date",
-            "utc datetime",
-            "when each list was",
-            "when a user submitted",
-            "specific dates",
-            "specific date",
-            "stores dates",
-            "dates as text",
-            "text-formatted dates",
-            "of type date",
-            "type: date",
-            "(type: date)",
-            "a datetime type",
-            "of type datetime",
-        )
-    ):
-        return "date"
-    if re.search(r"\b(date|timestamp|datetime)\s+(column|value|format|when)", d):
+    if _contains_date_literal(d):
         return "date"
-    if re.search(r"formatted as (text )?strings?.*\d{4}-\d{2}-\d{2}", d):
-        return "date"
-    if re.search(r"dates? indicating when", d):
+    if ("date" in d or "timestamp" in d or "formatted as" in d) and _RE_DATE.search(d):
         return "date"
     # numeric
-    if re.search(r"\binteger\b", d) or re.search(r"\b(an? )?integer\b", d):
-        return "num"
-    if re.search(r"\breal\b", d) or "real number" in d:
+    if ("integer" in d or "real" in d) and _RE_NUM.search(d) or "real number" in d:
         return "num"
     if "count of" in d or "number of" in d or "scale of 1" in d or "scale from 1" in d:
         return "num"
@@ -133,7 +165,7 @@ def infer_column_type(description: str) -> str:
     # string
     if "text-type" in d or "text type" in d or "text identifiers" in d:
         return "string"
-    if re.search(r"\btext\b", d) or " as text" in d or "text column" in d:
+    if "text" in d and _RE_TEXT.search(d) or " as text" in d or "text column" in d:
         return "string"
     if "url" in d or "urls" in d:
         return "string"
@@ -146,11 +178,25 @@ def infer_column_type(description: str) -> str:
     return "string"
 
 
+def infer_column_types(descriptions) -> list:
+    """Infer column types for a sequence of descriptions; result is in input order.
+    Descriptions are lowercased once up front, and each distinct one is classified once."""
+    lowered = [d.lower() for d in descriptions]
+    type_by_desc = {d: _infer_column_type_lower(d) for d in dict.fromkeys(lowered)}
+    return [type_by_desc[d] for d in lowered]
+
+
 def main():
-    with open(INPUT_PATH, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    if HAS_ORJSON:
+        with open(INPUT_PATH, "rb") as f:
+            data = orjson.loads(f.read())
+    else:
+        with open(INPUT_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
 
-    rows = []
+    # Validate keys first, then classify all descriptions in a single batch.
+    keys = []
+    descriptions = []
     for key, desc in data.items():
         parts = key.split("|")
         if len(parts) != 3:
@@ -158,28 +204,19 @@ def main():
         db_id, table_name, column_name = (p.strip() for p in parts)
         if not db_id or not table_name or not column_name:
             continue
-        column_type = infer_column_type(desc)
-        rows.append(
-            {
-                "database": db_id,
-                "table_name": table_name,
-                "column_name": column_name,
-                "column_type": column_type,
-            }
-        )
-
-    rows.sort(key=lambda r: (r["database"], r["table_name"], r["column_name"]))
+        keys.append((db_id, table_name, column_name))
+        descriptions.append(desc)
+    column_types = infer_column_types(descriptions)
+
+    rows = [key + (column_type,) for key, column_type in zip(keys, column_types)]
+    rows.sort(key=itemgetter(0, 1, 2))
 
     with open(OUTPUT_PATH, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=["database", "table_name", "column_name", "column_type"],
-            quoting=csv.QUOTE_MINIMAL,
-        )
-        writer.writeheader()
+        writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
+        writer.writerow(["database", "table_name", "column_name", "column_type"])
         writer.writerows(rows)
 
-    db_count = len({r["database"] for r in rows})
+    db_count = len({r[0] for r in rows})
     print(f"Wrote {len(rows)} rows ({db_count} databases) to {OUTPUT_PATH}")
 
 
@@ -10,14 +10,25 @@ using variable_list_bird.csv.
 import csv
 import re
 import os
+import shutil
 import sys
-from collections import defaultdict
-from itertools import product
+import tempfile
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import chain, islice, product
+from math import prod
 
 VARIABLE_LIST = os.path.join(os.path.dirname(__file__), "variable_list_bird.csv")
 TEMPLATES_CSV = os.path.join(os.path.dirname(__file__), "bird23_canonical_templates.csv")
 OUTPUT_CSV = os.path.join(os.path.dirname(__file__), "bird23_template_combinations.csv")
 
+_ALL_TYPES = frozenset({"num", "string", "date", "boolean"})
+# Rows per write when one table combo expands to many column combos (raw path)
+_ROW_BATCH = 10000
+# Shared-shape bodies each worker may have queued or written ahead of the output
+_SHAPES_AHEAD = 2
+
 
 def load_schema(path: str):
     """db_id -> {(table_name, column_name): column_type}"""
@@ -34,16 +45,56 @@ def load_schema(path: str):
     return dict(by_db)
 
 
+def build_column_index(schema_by_db):
+    """db_id -> {table_name: [(column_name, column_type), ...]} in schema order."""
+    index = {}
+    for db_id, schema in schema_by_db.items():
+        by_table = index[db_id] = {}
+        for (t, c), typ in schema.items():
+            by_table.setdefault(t, []).append((c, typ))
+    return index
+
+
+def _csv_safe(schema_by_db) -> bool:
+    """True if no db, table, or column name contains a character csv would quote."""
+    for db_id, schema in schema_by_db.items():
+        for name in chain((db_id,), *schema):
+            if "," in name or '"' in name or "\r" in name or "\n" in name:
+                return False
+    return True
+
+
+_RE_ALIAS_INDEX = re.compile(r"table_alias(\d+)")
+_RE_AVG_SUM = re.compile(r"\b(avg|sum)\s*\(")
+
+
+@lru_cache(maxsize=16)
+def _alias_patterns(alias_idx: int):
+    """Compiled type-context patterns for table_alias{alias_idx}.col_name:
+    (avg/sum, min/max, = string, = num, = boolean, like string)."""
+    alias_ref = re.escape(f"table_alias{alias_idx}.col_name")
+    return (
+        re.compile(r"\b(avg|sum)\s*\(\s*" + alias_ref),
+        re.compile(r"\b(min|max)\s*\(\s*" + alias_ref),
+        re.compile(alias_ref + r"\s*=\s*string\b"),
+        re.compile(alias_ref + r"\s*=\s*num\b"),
+        re.compile(alias_ref + r"\s*=\s*boolean\b"),
+        re.compile(alias_ref + r"\s*like\s*string"),
+    )
+
+
+@lru_cache(maxsize=None)
 def parse_template(sql: str):
     """
     Parse template to get:
     - num_tables: number of table slots (table_alias0, table_alias1, ... or 1 if no aliases)
     - column_types: list of allowed type sets, one per table slot (columns per table)
     Returns: (num_tables, column_types).
+    Results are memoized per sql string, so callers must not mutate column_types.
     """
     sql_lower = " " + sql.lower() + " "
     # Count table aliases: table_alias0, table_alias1, ...
-    alias_indices = set(re.findall(r"table_alias(\d+)", sql_lower))
+    alias_indices = set(_RE_ALIAS_INDEX.findall(sql_lower))
     if alias_indices:
         num_tables = max(int(i) for i in alias_indices) + 1
     else:
@@ -53,25 +104,25 @@ def parse_template(sql: str):
     # Per-alias type constraint: alias i's col_name has what allowed types?
     # Search for table_aliasN.col_name in context (AVG/SUM, = string, = num, = boolean, LIKE string)
     def type_for_alias(alias_idx: int):
-        alias_ref = f"table_alias{alias_idx}.col_name"
+        re_avg_sum, re_min_max, re_eq_string, re_eq_num, re_eq_boolean, re_like_string = _alias_patterns(alias_idx)
         allowed = None
         # AVG( table_aliasN.col_name ) / SUM( ... )
-        if re.search(r"\b(avg|sum)\s*\(\s*" + re.escape(alias_ref), sql_lower):
+        if re_avg_sum.search(sql_lower):
             allowed = _merge_type(allowed, {"num"})
-        if re.search(r"\b(min|max)\s*\(\s*" + re.escape(alias_ref), sql_lower):
+        if re_min_max.search(sql_lower):
             allowed = _merge_type(allowed, {"num", "date"}) if allowed is None else allowed
         # WHERE ... table_aliasN.col_name = string (or = num, = boolean)
-        if re.search(re.escape(alias_ref) + r"\s*=\s*string\b", sql_lower):
+        if re_eq_string.search(sql_lower):
             allowed = _merge_type(allowed, {"string"})
-        if re.search(re.escape(alias_ref) + r"\s*=\s*num\b", sql_lower):
+        if re_eq_num.search(sql_lower):
             allowed = _merge_type(allowed, {"num"})
-        if re.search(re.escape(alias_ref) + r"\s*=\s*boolean\b", sql_lower):
+        if re_eq_boolean.search(sql_lower):
             allowed = _merge_type(allowed, {"boolean"})
-        if re.search(re.escape(alias_ref) + r"\s*like\s*string", sql_lower):
+        if re_like_string.search(sql_lower):
             allowed = _merge_type(allowed, {"string"})
         # Unqualified col_name (single-table template): apply global constraints
         if num_tables == 1 and "col_name" in sql_lower:
-            if re.search(r"\b(avg|sum)\s*\(", sql_lower):
+            if _RE_AVG_SUM.search(sql_lower):
                 allowed = _merge_type(allowed, {"num"})
             if "= string" in sql_lower or "=string" in sql_lower:
                 allowed = _merge_type(allowed, {"string"})
@@ -88,7 +139,7 @@ def parse_template(sql: str):
     if num_tables == 1:
         # Single table: one column type set (may have one col or multiple cols; we use one slot per table)
         allowed = None
-        if re.search(r"\b(avg|sum)\s*\(", sql_lower):
+        if _RE_AVG_SUM.search(sql_lower):
             allowed = _merge_type(allowed, {"num"})
         if "= string" in sql_lower or "=string" in sql_lower:
             allowed = _merge_type(allowed, {"string"})
@@ -115,10 +166,125 @@ def _merge_type(current, new_set):
     return current & new_set if isinstance(current, set) else current
 
 
-def enumerate_combinations(schema_by_db, templates_path, output_path, limit=None):
+def _enumeration_context(schema_by_db):
+    """Invariants shared by all templates: sorted tables per db, and per (db, allowed
+    types) the non-empty (table, columns) pairs, filled lazily and reused across templates."""
+    column_index = build_column_index(schema_by_db)
+    return {
+        "column_index": column_index,
+        "tables_by_db": {db_id: sorted(by_table) for db_id, by_table in column_index.items()},
+        "cols_by_allowed": {},
+        # When no name needs CSV quoting, rows are joined and written directly, which
+        # yields the same bytes as csv.writer without its per-field formatting.
+        "raw": _csv_safe(schema_by_db),
+    }
+
+
+def _template_shape(sql):
+    """(num_tables, allowed type frozenset per slot). Templates with the same shape
+    have exactly the same (db, tables, columns) combinations."""
+    num_tables, column_types = parse_template(sql)
+    return num_tables, tuple(
+        frozenset(column_types[i]) if i < len(column_types) else _ALL_TYPES for i in range(num_tables)
+    )
+
+
+def _write_rows(f, writer, ctx, head, shape, max_tables):
+    """Write every combination row of a template shape to f, each row starting with the
+    fields in head (the template_id, or nothing for a shared shape body); returns the row count."""
+    column_index = ctx["column_index"]
+    cols_by_allowed = ctx["cols_by_allowed"]
+    raw = ctx["raw"]
+    num_tables, slot_allowed = shape
+    table_pad = ("",) * (max_tables - num_tables)
+    col_pad = [("",)] * (max_tables - num_tables)
+    count = 0
+    for db_id, tables_list in ctx["tables_by_db"].items():
+        if not tables_list:
+            continue
+        # Per slot, the (table, columns) pairs with at least one allowed column. Tables
+        # with none can only yield empty combos, so they are dropped before the product;
+        # the surviving combos keep their sorted order.
+        slot_entries = []
+        for allowed in slot_allowed:
+            key = (db_id, allowed)
+            entries = cols_by_allowed.get(key)
+            if entries is None:
+                columns_by_table = column_index[db_id]
+                entries = cols_by_allowed[key] = []
+                for t in tables_list:
+                    cols = [c for c, typ in columns_by_table[t] if typ in allowed]
+                    if cols:
+                        entries.append((t, cols))
+            slot_entries.append(entries)
+        row_head = head + (db_id,)
+        line_head = ",".join(map(str, row_head))
+        for entries in product(*slot_entries):
+            table_combo, slot_cols = zip(*entries)
+            # Cartesian expansion stays inside itertools: trailing ("",) factors
+            # fill the unused column slots, and the row prefix is prepended in C.
+            n = prod(map(len, slot_cols))
+            if raw:
+                line_prefix = ",".join((line_head,) + table_combo + table_pad)
+                lines = map(",".join, product((line_prefix,), *slot_cols, *col_pad))
+                if n <= _ROW_BATCH:
+                    f.write("\r\n".join(lines))
+                    f.write("\r\n")
+                else:
+                    # Wide combos are joined in bounded batches so memory stays flat
+                    batch = list(islice(lines, _ROW_BATCH))
+                    while batch:
+                        batch.append("")
+                        f.write("\r\n".join(batch))
+                        batch = list(islice(lines, _ROW_BATCH))
+            else:
+                prefix = row_head + table_combo + table_pad
+                writer.writerows(map(prefix.__add__, product(*slot_cols, *col_pad)))
+            count += n
+    return count
+
+
+def _append_body(f, writer, raw, body_path, template_id):
+    """Copy a shape body (rows without template_id) to f, prefixing template_id to every row."""
+    with open(body_path, "r", encoding="utf-8", newline="") as body:
+        if raw:
+            # Names contain no CR/LF, so every line is exactly one row
+            prefix = f"{template_id},"
+            lines = body.readlines(1 << 20)
+            while lines:
+                f.write("".join(map(prefix.__add__, lines)))
+                lines = body.readlines(1 << 20)
+        else:
+            writer.writerows(map([template_id].__add__, csv.reader(body)))
+
+
+# Per-process state for parallel enumeration, set once by _init_worker.
+_worker_ctx = None
+_worker_max_tables = 1
+
+
+def _init_worker(schema_by_db, max_tables):
+    global _worker_ctx, _worker_max_tables
+    _worker_ctx = _enumeration_context(schema_by_db)
+    _worker_max_tables = max_tables
+
+
+def _write_shape_body(shape, body_path):
+    """Worker task: enumerate one template shape into a body file (no template_id, no header)."""
+    with open(body_path, "w", encoding="utf-8", newline="", buffering=1 << 20) as f:
+        return _write_rows(f, csv.writer(f), _worker_ctx, (), shape, _worker_max_tables)
+
+
+def enumerate_combinations(schema_by_db, templates_path, output_path, limit=None, workers=1):
     """Enumerate (table_1, ..., table_N, col_1, ..., col_N) so table count and column count match template.
     Streams rows to CSV to avoid holding all in memory.
     If limit is set (e.g. 2), only process the first limit templates.
+    Templates sharing a shape (table count and per-slot types) are enumerated once into a
+    temporary body file that is copied for each of them with its template_id prefixed;
+    a shape used by a single template is written straight to the output.
+    If workers > 1, the shared shapes' bodies are enumerated in worker processes (at most
+    _SHAPES_AHEAD per worker ahead of the output) while this process writes the rest;
+    output is still written in template order (same bytes as workers=1).
     """
     templates = []
     with open(templates_path, "r", encoding="utf-8") as f:
@@ -137,41 +303,71 @@ def enumerate_combinations(schema_by_db, templates_path, output_path, limit=None
     table_fnames = ["table_name"] + [f"table_name_{i+1}" for i in range(1, max_tables)]
     column_fnames = ["column_name"] + [f"column_name_{i+1}" for i in range(1, max_tables)]
     fieldnames = ["template_id", "db_id"] + table_fnames + column_fnames
+    templates = [(template_id, _template_shape(sql)) for template_id, sql in templates if sql]
 
+    uses = Counter(shape for _, shape in templates)
+    remaining = Counter(uses)
+    # Shared shapes in order of first use (Counter keeps insertion order)
+    shared = [shape for shape, n in uses.items() if n > 1]
+    raw = _csv_safe(schema_by_db)
+    ctx = _enumeration_context(schema_by_db)
     count = 0
-    with open(output_path, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
-        writer.writeheader()
-        for template_id, sql in templates:
-            if not sql:
-                continue
-            num_tables, column_types = parse_template(sql)
-            for db_id, schema in schema_by_db.items():
-                tables_list = sorted(set(t for t, c in schema))
-                if not tables_list:
+    with open(output_path, "w", encoding="utf-8", newline="", buffering=1 << 20) as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        body_dir = tempfile.mkdtemp(prefix="combinations_", dir=os.path.dirname(os.path.abspath(output_path)))
+        body_paths = {shape: os.path.join(body_dir, f"shape_{i}.csv") for i, shape in enumerate(shared)}
+        ex = None
+        if workers > 1 and shared:
+            ex = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(schema_by_db, max_tables))
+        try:
+            # Bodies submitted to the pool but not yet reached by the output, in first-use order
+            pending = {}
+            to_submit = iter(shared)
+
+            def submit_ahead():
+                while len(pending) < _SHAPES_AHEAD * workers:
+                    shape = next(to_submit, None)
+                    if shape is None:
+                        return
+                    pending[shape] = ex.submit(_write_shape_body, shape, body_paths[shape])
+
+            if ex is not None:
+                submit_ahead()
+            body_counts = {}
+            for template_id, shape in templates:
+                if uses[shape] == 1:
+                    count += _write_rows(f, writer, ctx, (template_id,), shape, max_tables)
                     continue
-                for table_combo in product(tables_list, repeat=num_tables):
-                    slot_cols = []
-                    for i, table in enumerate(table_combo):
-                        allowed = column_types[i] if i < len(column_types) else {"num", "string", "date", "boolean"}
-                        cols = [c for (t, c), typ in schema.items() if t == table and typ in allowed]
-                        slot_cols.append(cols)
-                    if any(not s for s in slot_cols):
-                        continue
-                    for col_combo in product(*slot_cols):
-                        row = {"template_id": template_id, "db_id": db_id}
-                        for i in range(max_tables):
-                            k = "table_name" if i == 0 else f"table_name_{i+1}"
-                            row[k] = table_combo[i] if i < num_tables else ""
-                        for i in range(max_tables):
-                            k = "column_name" if i == 0 else f"column_name_{i+1}"
-                            row[k] = col_combo[i] if i < num_tables else ""
-                        writer.writerow(row)
-                        count += 1
+                if shape not in body_counts:
+                    if ex is not None:
+                        body_counts[shape] = pending.pop(shape).result()
+                        submit_ahead()
+                    else:
+                        with open(body_paths[shape], "w", encoding="utf-8", newline="", buffering=1 << 20) as body:
+                            body_counts[shape] = _write_rows(body, csv.writer(body), ctx, (), shape, max_tables)
+                _append_body(f, writer, raw, body_paths[shape], template_id)
+                count += body_counts[shape]
+                remaining[shape] -= 1
+                if not remaining[shape]:
+                    os.remove(body_paths[shape])
+        finally:
+            if ex is not None:
+                ex.shutdown(cancel_futures=True)
+            shutil.rmtree(body_dir, ignore_errors=True)
     return count
 
 
 def main():
+    workers = 1
+    if len(sys.argv) > 2:
+        try:
+            workers = int(sys.argv[2])
+        except ValueError:
+            workers = -1
+        if workers < 0:
+            sys.exit(f"usage: {sys.argv[0]} [limit] [workers]  (workers: integer >= 0, 0 = one per CPU core)")
+        workers = workers or (os.cpu_count() or 1)
     schema_by_db = load_schema(VARIABLE_LIST)
     print(f"Loaded {len(schema_by_db)} databases from {VARIABLE_LIST}")
     limit = None
@@ -183,7 +379,9 @@ def main():
             print(f"Limit: first {limit} templates -> {out_path}")
         except ValueError:
             pass
-    n = enumerate_combinations(schema_by_db, TEMPLATES_CSV, out_path, limit=limit)
+    if len(sys.argv) > 2:
+        print(f"Workers: {workers}")
+    n = enumerate_combinations(schema_by_db, TEMPLATES_CSV, out_path, limit=limit, workers=workers)
     print(f"Wrote {n} combinations to {out_path}")
 
 
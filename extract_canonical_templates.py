@@ -6,31 +6,25 @@ extract all distinct templates, and write to a new CSV.
 
 import csv
 import os
+from collections import Counter
 
 INPUT_CSV = os.path.join(os.path.dirname(__file__), "bird23-train-filtered-canonical.csv")
 OUTPUT_CSV = os.path.join(os.path.dirname(__file__), "bird23_canonical_templates.csv")
 
 
 def main():
-    template_to_count = {}
     with open(INPUT_CSV, "r", encoding="utf-8") as f:
         reader = csv.DictReader(f)
-        for row in reader:
-            t = (row.get("canonical_sql") or "").strip()
-            if t:
-                template_to_count[t] = template_to_count.get(t, 0) + 1
+        templates = ((row.get("canonical_sql") or "").strip() for row in reader)
+        template_to_count = Counter(t for t in templates if t)
 
     # Sort by count descending, then by template string for stable order
-    distinct = sorted(
-        [(sql, template_to_count[sql]) for sql in template_to_count],
-        key=lambda x: (-x[1], x[0]),
-    )
+    distinct = sorted(template_to_count.items(), key=lambda x: (-x[1], x[0]))
 
-    with open(OUTPUT_CSV, "w", encoding="utf-8", newline="") as f:
+    with open(OUTPUT_CSV, "w", encoding="utf-8", newline="", buffering=1 << 20) as f:
         writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
         writer.writerow(["template_id", "canonical_sql", "count"])
-        for i, (sql, count) in enumerate(distinct, start=1):
-            writer.writerow([i, sql, count])
+        writer.writerows((i, sql, count) for i, (sql, count) in enumerate(distinct, start=1))
 
     print(f"Read {sum(c for _, c in distinct)} rows from {INPUT_CSV}")
     print(f"Wrote {len(distinct)} distinct templates to {OUTPUT_CSV}")
@@ -5,13 +5,20 @@ Preserves exact SQL structure; replaces only identifiers and literals with place
 Rules: tables -> table_name, columns -> col_name,
       table aliases -> table_alias_placeholder0,1,..., column aliases -> col_alias_placeholder0,1,...
       numbers -> NUM, strings -> STR, dates/times -> DATE.
+Pure Python (sqlparse and orjson are optional), so it also runs unmodified under PyPy,
+whose JIT speeds up the regex/dict-heavy per-row work on large inputs:
+    pypy3 sql_canonicalizer.py bird23-train-filtered --jobs 0
 """
 
+import argparse
 import re
 import csv
 import json
 import os
-import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import tee
+from operator import itemgetter
 from io import StringIO
 
 # Try sqlparse for tokenization (optional)
@@ -23,92 +30,119 @@ try:
 except ImportError:
     HAS_SQLPARSE = False
 
+# Use orjson for parsing JSONL rows when available (optional)
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Static patterns, compiled once at import instead of looked up per call.
+# Literals: DATE '...', TIMESTAMP '...', TIME '...', INTERVAL '...'; quoted strings; numbers
+# Date and quoted-string literals share one scan; the "date" group tells them apart.
+# String bodies are written unrolled ([^']* runs between '' escapes) rather than as a
+# one-character alternation, so long literals are consumed in runs without per-character
+# backtracking points; the matches are the same.
+_RE_QUOTED_LITERAL = re.compile(
+    r"(?P<date>\b(?i:DATE|TIMESTAMP|TIME|INTERVAL)\s*'[^']*(?:''[^']*)*')"
+    r"|'[^']*(?:''[^']*)*'"
+    r'|"[^"\\]*(?:\\.[^"\\]*)*"'
+)
+# Numbers run on the text after quoted literals are replaced, since their \b depends
+# on the placeholders. A ".5" form needs no own pattern: its digits follow a non-word
+# "." so this pattern already matches them (leaving the "." in place).
+_RE_NUM = re.compile(r"\b\d+\.?\d*(?:[eE][-+]?\d+)?\b")
+# Identifier context
+_RE_CTE = re.compile(r'(?i)\bWITH\s+(\w+)\s+AS\s+')
+# FROM, JOIN or INNER/LEFT/RIGHT/FULL/CROSS/OUTER JOIN; group "kw" is the closing FROM/JOIN word
+_FROM_JOIN_KW = r'(?:(?:INNER|LEFT|RIGHT|FULL|CROSS|OUTER)\s+(?=JOIN))?(?P<kw>FROM|JOIN)'
+_FROM_JOIN_LOOKAHEAD = r'(?=\s+ON|\s+USING|\s*\)|\s*,|\s+GROUP|\s+ORDER|\s+WHERE|\s+HAVING|\s+LIMIT|\s+OFFSET|\s*;|\s+JOIN|\s+LEFT|\s+INNER|\s+RIGHT|\s+CROSS|\s+FULL|\s+OUTER|\s*$)'
+# FROM/JOIN table forms, tried together in one scan: the scan consumes a FROM/JOIN keyword
+# and each form's remainder is a lookahead capturing it, so the caller can replay the three
+# forms as if each had been scanned on its own (a form's next match starts after its
+# previous one). The only keyword start inside a consumed keyword is the JOIN of "X JOIN",
+# which has the same remainder, so a form match is taken to start at the "kw" word.
+#   groups 2-4: FROM/JOIN table AS alias — explicit table alias
+#   groups 5-7: FROM/JOIN table alias — table alias without AS
+#   groups 8-9: FROM/JOIN table only (no alias) — e.g. "FROM lists_users WHERE"
+_RE_FROM_JOIN = re.compile(
+    _FROM_JOIN_KW
+    + r'(?:(?=(\s+(\w+)\s+AS\s+(\w+)' + _FROM_JOIN_LOOKAHEAD + r')))?'
+    + r'(?:(?=(\s+(\w+)\s+(\w+)' + _FROM_JOIN_LOOKAHEAD + r')))?'
+    + r'(?:(?=(\s+(\w+)' + _FROM_JOIN_LOOKAHEAD + r')))?',
+    re.I,
+)
+# AS alias (for column alias we take only those not already table aliases)
+_RE_AS_ALIAS = re.compile(r'(?i)\bAS\s+(\w+)(?:\s*[,\)]|\s+[A-Z_]|\s*$)')
+_RE_QUALIFIED_COL = re.compile(r'\b(\w+)\.(\w+)\b')
+# Comment segmenter: a comment (group 1) or a quoted string, whichever starts first.
+# Comment markers inside quotes are skipped with the string. Strings honour backslash
+# escapes and end at the last quote of a run ('' does not keep them open); unterminated
+# comments and strings run to the end of the SQL.
+_RE_COMMENT_OR_STRING = re.compile(
+    r"(--[^\n]*\n?|/\*.*?(?:\*/|\Z))"
+    r"|'(?:[^'\\]+|\\.)*(?:'+|\\)?"
+    r'|"(?:[^"\\]+|\\.)*(?:"+|\\)?',
+    re.S,
+)
+# \w+ words that float() accepts: digits with optional _ separators and exponent, inf, nan
+_RE_NUMERIC_WORD = re.compile(r'\d(?:_?\d)*(?:[eE]\d(?:_?\d)*)?|inf(?:inity)?|nan', re.I)
+# Identifier tokens for _apply_identifier_replacements: word, or dotted chain such as
+# alias.col or schema.table.col
+_RE_IDENT = re.compile(r'\w+')
+_RE_DOTTED_WORDS = re.compile(r'\w+(?:\.\w+)*')
+# Placeholder names produced by the canonicalizer itself
+_RE_ALIAS_PLACEHOLDER = re.compile(r'^(?:table_alias_placeholder|col_alias_placeholder)\d+$', re.I)
+_RE_ANY_ALIAS_PLACEHOLDER = re.compile(
+    r'^(?:table_alias_placeholder|col_alias_placeholder|table_alias|column_alias)\d+$', re.I
+)
+# Columns never renamed to col_name: placeholders (any case) and schema type words
+_PLACEHOLDER_UPPER = frozenset({"NUM", "STR", "DATE", "TABLE_NAME", "COL_NAME"})
+_TYPE_WORDS = frozenset({"num", "string", "date", "boolean"})
+
 
 def _split_comments(sql: str):
     """Split SQL into segments (is_comment, text). Comments are preserved as-is."""
     segments = []
-    i = 0
-    n = len(sql)
-    in_single = False
-    in_double = False
     code_start = 0
-    while i < n:
-        if in_single:
-            if sql[i] == "'" and (i + 1 >= n or sql[i + 1] != "'"):
-                in_single = False
-            elif sql[i] == "\\":
-                i += 1  # skip escaped char
-            i += 1
-            continue
-        if in_double:
-            if sql[i] == '"' and (i + 1 >= n or sql[i + 1] != '"'):
-                in_double = False
-            elif sql[i] == "\\":
-                i += 1
-            i += 1
-            continue
-        if not in_single and not in_double and i + 2 <= n and sql[i : i + 2] == "--":
-            if i > code_start:
-                segments.append((False, sql[code_start:i]))
-            start = i
-            i += 2
-            while i < n and sql[i] != "\n":
-                i += 1
-            if i < n:
-                i += 1
-            segments.append((True, sql[start:i]))
-            code_start = i
-            continue
-        if not in_single and not in_double and i + 2 <= n and sql[i : i + 2] == "/*":
-            if i > code_start:
-                segments.append((False, sql[code_start:i]))
-            start = i
-            i += 2
-            while i < n - 1 and sql[i : i + 2] != "*/":
-                i += 1
-            i = i + 2 if i < n - 1 else n
-            segments.append((True, sql[start:i]))
-            code_start = i
-            continue
-        if sql[i] == "'" and not in_double:
-            in_single = True
-        elif sql[i] == '"' and not in_single:
-            in_double = True
-        i += 1
-    if code_start < n:
-        segments.append((False, sql[code_start:n]))
+    for m in _RE_COMMENT_OR_STRING.finditer(sql):
+        if m.lastindex is None:
+            continue  # quoted string: part of the code segment
+        start, end = m.span()
+        if start > code_start:
+            segments.append((False, sql[code_start:start]))
+        segments.append((True, m.group(1)))
+        code_start = end
+    if code_start < len(sql):
+        segments.append((False, sql[code_start:]))
     return segments
 
 
 def _replace_literals(sql: str) -> str:
     """Replace string, date, and numeric literals with placeholders. Preserves structure."""
-    out = sql
+    # 1. Date/timestamp/time/interval literals and string literals ('' escape; double-quoted
+    # strings too, often identifiers in standard SQL but some DBs use them for strings)
+    out = _RE_QUOTED_LITERAL.sub(_quoted_placeholder, sql)
+    # 2. Numbers: integer, decimal, scientific
+    return _RE_NUM.sub("NUM", out)
 
-    # 1. Date/timestamp/time literals (before string literals to avoid matching quote in DATE '...')
-    # DATE '...', TIMESTAMP '...', TIME '...', INTERVAL '...'
-    date_pattern = r"(?i)\b(DATE|TIMESTAMP|TIME|INTERVAL)\s*'([^']|'')*'"
-    out = re.sub(date_pattern, r"DATE", out)
 
-    # 2. String literals: single-quoted (allow '' for escape)
-    def repl_str_single(m):
-        return "STR"
-    out = re.sub(r"'([^']|'')*'", repl_str_single, out)
-    # Double-quoted strings (often identifiers in standard SQL but some DBs use for strings)
-    out = re.sub(r'"([^"\\]|\\.)*"', repl_str_single, out)
+def _quoted_placeholder(m):
+    return "DATE" if m.lastgroup else "STR"
 
-    # 3. Numbers: integer, decimal, scientific
-    out = re.sub(r"\b\d+\.?\d*([eE][-+]?\d+)?\b", "NUM", out)
-    out = re.sub(r"\b\.\d+([eE][-+]?\d+)?\b", "NUM", out)
 
-    return out
+def _quoted_placeholder_bird(m):
+    return "date" if m.lastgroup else "string"
 
 
 def _is_numeric_token(w: str) -> bool:
     """True if token looks like a number (so we don't treat it as column when parsing raw SQL)."""
     if not w:
         return False
-    if w.isdigit():
+    if w.isdigit() or _RE_NUMERIC_WORD.fullmatch(w):
         return True
+    if _RE_IDENT.fullmatch(w):
+        return False  # any other word is rejected by float() too
     try:
         float(w)
         return True
@@ -116,49 +150,168 @@ def _is_numeric_token(w: str) -> bool:
         return False
 
 
-def _build_boolean_col_refs(schema, tables, alias_to_table):
+class _SchemaKey(tuple):
+    """Snapshot of a schema dict's ((table, column), type) items, in order, hashed once."""
+
+    def __new__(cls, items):
+        self = super().__new__(cls, items)
+        self._hash = tuple.__hash__(self)
+        return self
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        # Rebuild (and rehash) in the receiving process: str hashes differ between processes
+        return _SchemaKey, (tuple(self),)
+
+
+@lru_cache(maxsize=256)
+def _intern_schema_key(key):
+    """The first-seen key equal to key, so equal schemas share one snapshot in the caches."""
+    return key
+
+
+def _schema_key(schema):
     """
-    Build set of strings that denote a boolean column reference in SQL.
-    schema: dict (table_name, column_name) -> type. Returns list of ref strings, sorted by length desc.
+    Hashable snapshot of a schema dict (None for no/empty schema). Caches keyed on it follow
+    the schema's contents, so a schema changed after use gets fresh results. Building it is
+    O(len(schema)): callers running many rows against a fixed schema take it once.
     """
     if not schema:
-        return []
+        return None
+    return _intern_schema_key(_SchemaKey(schema.items()))
+
+
+@lru_cache(maxsize=256)
+def _boolean_columns(schema_key):
+    """Tuple of (table, column) pairs typed boolean/bool in the schema, computed once per schema."""
+    return tuple((t, c) for (t, c), typ in schema_key if typ.lower() in ("boolean", "bool"))
+
+
+@lru_cache(maxsize=256)
+def _schema_index(schema_key):
+    """
+    Schema inverted once per schema: (table -> ((col, type), ...) in schema order,
+    col -> type for columns that have a single type across all tables).
+    """
+    by_table = {}
+    col_to_types = {}
+    for (t, c), typ in schema_key:
+        by_table.setdefault(t, []).append((c, typ))
+        col_to_types.setdefault(c, set()).add(typ)
+    schema_by_table = {t: tuple(cols) for t, cols in by_table.items()}
+    unique_col_type = {c: next(iter(types)) for c, types in col_to_types.items() if len(types) == 1}
+    return schema_by_table, unique_col_type
+
+
+def _build_boolean_col_refs(schema_key, tables, alias_to_table):
+    """
+    Build set of strings that denote a boolean column reference in SQL.
+    schema_key: _schema_key of the dict (table_name, column_name) -> type. Returns tuple of
+    (ref, compiled patterns), sorted by ref length desc; memoized on the schema's boolean
+    columns, tables and aliases.
+    """
+    if not schema_key:
+        return ()
+    bool_cols = _boolean_columns(schema_key)
+    if not bool_cols:
+        return ()
+    return _boolean_col_refs(bool_cols, frozenset(tables), frozenset(alias_to_table.items()))
+
+
+@lru_cache(maxsize=4096)
+def _boolean_col_refs(bool_cols, tables, alias_items):
     refs = set()
-    tables_set = set(tables)
-    for (t, c), typ in schema.items():
-        if typ.lower() not in ("boolean", "bool"):
-            continue
+    for t, c in bool_cols:
         refs.add(f"{t}.{c}")
-        for alias, tbl in alias_to_table.items():
+        for alias, tbl in alias_items:
             if tbl == t:
                 refs.add(f"{alias}.{c}")
-    for (t, c), typ in schema.items():
-        if typ.lower() not in ("boolean", "bool"):
-            continue
-        if t in tables_set:
+    for t, c in bool_cols:
+        if t in tables:
             refs.add(c)
-    return sorted(refs, key=len, reverse=True)
+    return tuple((ref, _bool_ref_patterns(ref)) for ref in sorted(refs, key=len, reverse=True))
+
+
+@lru_cache(maxsize=None)
+def _bool_ref_patterns(ref: str):
+    """Compiled (ref = num, ref = 'str', num = ref, 'str' = ref) patterns for a boolean column ref."""
+    ref_esc = re.escape(ref)
+    return (
+        re.compile(r"\b" + ref_esc + r"\s*=\s*(\d+)\b"),
+        re.compile(r"\b" + ref_esc + r"\s*=\s*'[^']*(?:''[^']*)*'"),
+        re.compile(r"\b(\d+)\s*=\s*" + ref_esc + r"\b"),
+        re.compile(r"'[^']*(?:''[^']*)*'\s*=\s*" + ref_esc + r"\b"),
+    )
 
 
-def _replace_literals_bird(sql: str, boolean_col_refs: list) -> str:
+def _replace_literals_bird(sql: str, boolean_col_refs) -> str:
     """
     Replace literals with placeholders: num, string, date, boolean (lowercase).
     When a literal is compared to a boolean column (in condition), use "boolean".
     """
     out = sql
-    for ref in boolean_col_refs:
-        ref_esc = re.escape(ref)
-        out = re.sub(r"\b" + ref_esc + r"\s*=\s*(\d+)\b", ref + " = boolean", out)
-        out = re.sub(r"\b" + ref_esc + r"\s*=\s*'([^']|'')*'", ref + " = boolean", out)
-        out = re.sub(r"\b(\d+)\s*=\s*" + ref_esc + r"\b", "boolean = " + ref, out)
-        out = re.sub(r"'([^']|'')*'\s*=\s*" + ref_esc + r"\b", "boolean = " + ref, out)
-    date_pattern = r"(?i)\b(DATE|TIMESTAMP|TIME|INTERVAL)\s*'([^']|'')*'"
-    out = re.sub(date_pattern, "date", out)
-    out = re.sub(r"'([^']|'')*'", "string", out)
-    out = re.sub(r'"([^"\\]|\\.)*"', "string", out)
-    out = re.sub(r"\b\d+\.?\d*([eE][-+]?\d+)?\b", "num", out)
-    out = re.sub(r"\b\.\d+([eE][-+]?\d+)?\b", "num", out)
-    return out
+    for ref, (ref_eq_num, ref_eq_str, num_eq_ref, str_eq_ref) in boolean_col_refs:
+        # Every pattern contains ref literally: skip the four full-text passes when it is absent
+        if ref not in out:
+            continue
+        out = ref_eq_num.sub(ref + " = boolean", out)
+        out = ref_eq_str.sub(ref + " = boolean", out)
+        out = num_eq_ref.sub("boolean = " + ref, out)
+        out = str_eq_ref.sub("boolean = " + ref, out)
+    out = _RE_QUOTED_LITERAL.sub(_quoted_placeholder_bird, out)
+    return _RE_NUM.sub("num", out)
+
+
+# Keyword sets for _collect_identifiers_regex (compared against upper-cased words)
+# Words after FROM/JOIN table that are not a table alias
+_NOT_TABLE_ALIAS_KW = frozenset({
+    'ON', 'USING', 'WHERE', 'LEFT', 'RIGHT', 'INNER', 'OUTER', 'CROSS', 'JOIN',
+    'GROUP', 'ORDER', 'HAVING', 'LIMIT', 'OFFSET', 'AND', 'OR', 'BY', 'SELECT',
+    'FROM', 'AS', 'WITH', 'END', 'THEN', 'ELSE', 'WHEN', 'NULL', 'TRUE', 'FALSE',
+})
+# Words after AS that are not a column alias
+_COL_ALIAS_KW = frozenset({
+    'SELECT', 'FROM', 'WHERE', 'GROUP', 'ORDER', 'BY', 'HAVING', 'ON', 'AND', 'OR',
+    'END', 'THEN', 'ELSE', 'WHEN', 'NULL', 'TRUE', 'FALSE', 'WITH', 'AS', 'DISTINCT',
+    'FILTER', 'WITHIN', 'OVER', 'PARTITION', 'BETWEEN', 'LIKE', 'IN', 'IS', 'NOT',
+    'EXISTS', 'CASE', 'ASC', 'DESC', 'LIMIT', 'OFFSET',
+})
+# Qualifiers whose .col is not collected as a column
+_QUALIFIER_NOT_COLUMN_KW = frozenset({'ON', 'BY', 'AND', 'OR', 'SELECT', 'FROM'})
+# Qualifiers that are never taken as table aliases
+_QUALIFIER_NOT_ALIAS_KW = frozenset({
+    'NUM', 'STR', 'DATE', 'GROUP', 'ORDER', 'WITHIN', 'OVER', 'PARTITION',
+    'BETWEEN', 'LIKE', 'IN', 'IS', 'NOT', 'EXISTS', 'CASE', 'THEN', 'ELSE', 'WHEN', 'END', 'TRUE', 'FALSE', 'NULL',
+})
+# Placeholder names for replacement checks (so we don't treat them as columns)
+_PLACEHOLDER_KW = frozenset({
+    'NUM', 'STR', 'DATE', 'TABLE_NAME', 'COL_NAME',
+    'TABLE_ALIAS_PLACEHOLDER0', 'TABLE_ALIAS_PLACEHOLDER1', 'TABLE_ALIAS_PLACEHOLDER2',
+    'COL_ALIAS_PLACEHOLDER0', 'COL_ALIAS_PLACEHOLDER1', 'COL_ALIAS_PLACEHOLDER2',
+    'num', 'string', 'date', 'boolean',
+    'table_alias0', 'table_alias1', 'table_alias2', 'column_alias0', 'column_alias1', 'column_alias2',
+})
+# Placeholder words as written by the canonicalizer (exact case)
+_PLACEHOLDER_WORDS = frozenset({'table_name', 'col_name', 'NUM', 'STR', 'DATE', 'num', 'string', 'date', 'boolean'})
+# Words never collected as columns: SQL keywords, functions, domain terms, placeholders
+_KEYWORDS = frozenset({
+    'SELECT', 'FROM', 'WHERE', 'GROUP', 'BY', 'ORDER', 'HAVING', 'ON', 'AND', 'OR',
+    'JOIN', 'LEFT', 'RIGHT', 'INNER', 'OUTER', 'CROSS', 'FULL', 'AS', 'DISTINCT',
+    'NULL', 'TRUE', 'FALSE', 'BETWEEN', 'LIKE', 'IN', 'IS', 'NOT', 'EXISTS',
+    'CASE', 'WHEN', 'THEN', 'ELSE', 'END', 'ASC', 'DESC', 'LIMIT', 'OFFSET',
+    'WITH', 'FILTER', 'WITHIN', 'OVER', 'PARTITION', 'RANGE', 'ROWS',
+    'USING', 'TABLE', 'INTO', 'UPDATE', 'SET', 'VALUES', 'INSERT', 'DELETE',
+    'CREATE', 'ALTER', 'DROP', 'INDEX', 'PRIMARY', 'KEY', 'REFERENCES',
+    'COUNT', 'SUM', 'AVG', 'MIN', 'MAX', 'STDDEV', 'PERCENTILE_CONT',
+    'ABS', 'ROUND', 'STRING_AGG', 'JSON_BUILD_OBJECT', 'JSON_OBJECT_AGG',
+    'COALESCE', 'NULLIF', 'CAST', 'EXTRACT', 'UNNEST', 'ARRAY',
+    'SUBSTR', 'SUBSTRING', 'STRFTIME', 'LENGTH', 'CONCAT',
+    'REPLACE', 'TRIM', 'UPPER', 'LOWER', 'INSTR', 'DATE', 'YEAR', 'MONTH',
+    'LATERAL', 'CROSS', 'UNION', 'EXCEPT', 'INTERSECT', 'ALL', 'ANY',
+    'SIGNAL', 'NOISE', 'SNQI', 'SSM', 'TOLS', 'MCS', 'RPI', 'BFR', 'LIF', 'CCS', 'CIP',
+}) | _PLACEHOLDER_KW
 
 
 def _collect_identifiers_regex(sql: str, raw_sql: bool = False):
@@ -167,123 +320,86 @@ def _collect_identifiers_regex(sql: str, raw_sql: bool = False):
     Returns (tables, table_alias_map, col_alias_map, columns, alias_to_table).
     If raw_sql=True, do not add numeric-only tokens to columns (for use before literal replacement).
     """
-    cte_ctx = r'(?i)\bWITH\s+(\w+)\s+AS\s+'
-    not_table_alias_kw = {
-        'ON', 'USING', 'WHERE', 'LEFT', 'RIGHT', 'INNER', 'OUTER', 'CROSS', 'JOIN',
-        'GROUP', 'ORDER', 'HAVING', 'LIMIT', 'OFFSET', 'AND', 'OR', 'BY', 'SELECT',
-        'FROM', 'AS', 'WITH', 'END', 'THEN', 'ELSE', 'WHEN', 'NULL', 'TRUE', 'FALSE',
-    }
-    lookahead = r'(?=\s+ON|\s+USING|\s*\)|\s*,|\s+GROUP|\s+ORDER|\s+WHERE|\s+HAVING|\s+LIMIT|\s+OFFSET|\s*;|\s+JOIN|\s+LEFT|\s+INNER|\s+RIGHT|\s+CROSS|\s+FULL|\s+OUTER|\s*$)'
-    # FROM/JOIN table [AS] alias — table alias (explicit "table AS alias" or "table alias")
-    from_join_with_as = r'(?i)(?:FROM|JOIN|INNER\s+JOIN|LEFT\s+JOIN|RIGHT\s+JOIN|FULL\s+JOIN|CROSS\s+JOIN|OUTER\s+JOIN)\s+(\w+)\s+AS\s+(\w+)' + lookahead
-    from_join_no_as = r'(?i)(?:FROM|JOIN|INNER\s+JOIN|LEFT\s+JOIN|RIGHT\s+JOIN|FULL\s+JOIN|CROSS\s+JOIN|OUTER\s+JOIN)\s+(\w+)(?:\s+(\w+))' + lookahead
-    # FROM/JOIN table only (no alias) — e.g. "FROM lists_users WHERE"
-    from_join_table_only = r'(?i)(?:FROM|JOIN|INNER\s+JOIN|LEFT\s+JOIN|RIGHT\s+JOIN|FULL\s+JOIN|CROSS\s+JOIN|OUTER\s+JOIN)\s+(\w+)' + lookahead
-    # AS alias (for column alias we take only those not already table aliases)
-    as_alias = r'(?i)\bAS\s+(\w+)(?:\s*[,\)]|\s+[A-Z_]|\s*$)'
-
     tables = set()
-    table_alias_order = []   # table aliases: T1, T2, s, t, o
+    # Alias orders are dicts used as insertion-ordered sets (O(1) membership)
+    table_alias_order = {}   # table aliases: T1, T2, s, t, o
     alias_to_table = {}      # table alias -> actual table name (for schema-aware replacement)
-    col_alias_order = []     # column aliases: avg_snqi, tol_category
+    col_alias_order = {}     # column aliases: avg_snqi, tol_category
 
     # CTE names
-    for m in re.finditer(cte_ctx, sql):
+    for m in _RE_CTE.finditer(sql):
         tables.add(m.group(1))
 
+    # FROM/JOIN tables, in one scan; a form's match only counts if it starts after that
+    # form's previous match ended, as when each form had its own finditer pass. It can
+    # start as late as the closing FROM/JOIN word of the keyword.
+    with_as = []
+    no_as = []
+    table_only = []
+    with_as_end = no_as_end = table_only_end = 0
+    for m in _RE_FROM_JOIN.finditer(sql):
+        start = m.start("kw")
+        if m.group(2) is not None and start >= with_as_end:
+            with_as_end = m.end(2)
+            with_as.append(m.group(3, 4))
+        if m.group(5) is not None and start >= no_as_end:
+            no_as_end = m.end(5)
+            no_as.append(m.group(6, 7))
+        if m.group(8) is not None and start >= table_only_end:
+            table_only_end = m.end(8)
+            table_only.append(m.group(9))
+
     # Table aliases: FROM/JOIN table AS alias
-    for m in re.finditer(from_join_with_as, sql):
-        t, a = m.group(1), m.group(2)
+    for t, a in with_as:
         tables.add(t)
-        if a.upper() not in not_table_alias_kw:
+        if a.upper() not in _NOT_TABLE_ALIAS_KW:
             alias_to_table[a] = t
-            if a not in table_alias_order:
-                table_alias_order.append(a)
+            table_alias_order[a] = None
 
     # Table aliases: FROM/JOIN table alias (no AS — so second word must not be "AS")
-    for m in re.finditer(from_join_no_as, sql):
-        t, a = m.group(1), m.group(2)
+    for t, a in no_as:
         tables.add(t)
-        if a and a.upper() != 'AS' and a.upper() not in not_table_alias_kw:
+        if a and a.upper() != 'AS' and a.upper() not in _NOT_TABLE_ALIAS_KW:
             alias_to_table[a] = t
-            if a not in table_alias_order:
-                table_alias_order.append(a)
+            table_alias_order[a] = None
 
     # Table only (no alias): FROM/JOIN table followed by WHERE, GROUP, etc.
-    for m in re.finditer(from_join_table_only, sql):
-        tables.add(m.group(1))
+    tables.update(table_only)
 
-    table_aliases_set = set(table_alias_order)
 
     # Column aliases: AS alias that is not a table alias (e.g. in SELECT expr AS col_alias)
-    col_alias_kw = (
-        'SELECT', 'FROM', 'WHERE', 'GROUP', 'ORDER', 'BY', 'HAVING', 'ON', 'AND', 'OR',
-        'END', 'THEN', 'ELSE', 'WHEN', 'NULL', 'TRUE', 'FALSE', 'WITH', 'AS', 'DISTINCT',
-        'FILTER', 'WITHIN', 'OVER', 'PARTITION', 'BETWEEN', 'LIKE', 'IN', 'IS', 'NOT',
-        'EXISTS', 'CASE', 'ASC', 'DESC', 'LIMIT', 'OFFSET',
-    )
-    for m in re.finditer(as_alias, sql):
+    for m in _RE_AS_ALIAS.finditer(sql):
         a = m.group(1)
-        if a.upper() in col_alias_kw:
+        if a.upper() in _COL_ALIAS_KW:
             continue
-        if a in table_aliases_set:
+        if a in table_alias_order:
             continue  # already table alias
-        if a not in col_alias_order:
-            col_alias_order.append(a)
+        col_alias_order[a] = None
 
     # Qualified column: qualifier.col — qualifier can be table alias or table name
     columns = set()
-    for m in re.finditer(r'\b(\w+)\.(\w+)\b', sql):
+    for m in _RE_QUALIFIED_COL.finditer(sql):
         qual, col = m.group(1), m.group(2)
-        if qual.upper() not in ('ON', 'BY', 'AND', 'OR', 'SELECT', 'FROM'):
+        qual_upper = qual.upper()
+        if qual_upper not in _QUALIFIER_NOT_COLUMN_KW:
             columns.add(col)
-        if qual not in table_alias_order and qual not in tables and qual.upper() not in (
-            'NUM', 'STR', 'DATE', 'GROUP', 'ORDER', 'WITHIN', 'OVER', 'PARTITION',
-            'BETWEEN', 'LIKE', 'IN', 'IS', 'NOT', 'EXISTS', 'CASE', 'THEN', 'ELSE', 'WHEN', 'END', 'TRUE', 'FALSE', 'NULL',
-        ):
-            if qual not in table_alias_order:
-                table_alias_order.append(qual)
-                table_aliases_set.add(qual)
+        if qual not in table_alias_order and qual not in tables and qual_upper not in _QUALIFIER_NOT_ALIAS_KW:
+            table_alias_order[qual] = None
 
     table_alias_map = {a: f"table_alias_placeholder{i}" for i, a in enumerate(table_alias_order)}
     col_alias_map = {a: f"col_alias_placeholder{i}" for i, a in enumerate(col_alias_order)}
-    col_aliases_set = set(col_alias_order)
-
-    # Placeholder names for replacement checks (so we don't treat them as columns)
-    placeholder_keywords = {
-        'NUM', 'STR', 'DATE', 'TABLE_NAME', 'COL_NAME',
-        'TABLE_ALIAS_PLACEHOLDER0', 'TABLE_ALIAS_PLACEHOLDER1', 'TABLE_ALIAS_PLACEHOLDER2',
-        'COL_ALIAS_PLACEHOLDER0', 'COL_ALIAS_PLACEHOLDER1', 'COL_ALIAS_PLACEHOLDER2',
-        'num', 'string', 'date', 'boolean',
-        'table_alias0', 'table_alias1', 'table_alias2', 'column_alias0', 'column_alias1', 'column_alias2',
-    }
-    keywords = {
-        'SELECT', 'FROM', 'WHERE', 'GROUP', 'BY', 'ORDER', 'HAVING', 'ON', 'AND', 'OR',
-        'JOIN', 'LEFT', 'RIGHT', 'INNER', 'OUTER', 'CROSS', 'FULL', 'AS', 'DISTINCT',
-        'NULL', 'TRUE', 'FALSE', 'BETWEEN', 'LIKE', 'IN', 'IS', 'NOT', 'EXISTS',
-        'CASE', 'WHEN', 'THEN', 'ELSE', 'END', 'ASC', 'DESC', 'LIMIT', 'OFFSET',
-        'WITH', 'FILTER', 'WITHIN', 'OVER', 'PARTITION', 'RANGE', 'ROWS',
-        'USING', 'TABLE', 'INTO', 'UPDATE', 'SET', 'VALUES', 'INSERT', 'DELETE',
-        'CREATE', 'ALTER', 'DROP', 'INDEX', 'PRIMARY', 'KEY', 'REFERENCES',
-        'COUNT', 'SUM', 'AVG', 'MIN', 'MAX', 'STDDEV', 'PERCENTILE_CONT',
-        'ABS', 'ROUND', 'STRING_AGG', 'JSON_BUILD_OBJECT', 'JSON_OBJECT_AGG',
-        'COALESCE', 'NULLIF', 'CAST', 'EXTRACT', 'UNNEST', 'ARRAY',
-        'SUBSTR', 'SUBSTRING', 'STRFTIME', 'LENGTH', 'CONCAT',
-        'REPLACE', 'TRIM', 'UPPER', 'LOWER', 'INSTR', 'DATE', 'YEAR', 'MONTH',
-        'LATERAL', 'CROSS', 'UNION', 'EXCEPT', 'INTERSECT', 'ALL', 'ANY',
-        'SIGNAL', 'NOISE', 'SNQI', 'SSM', 'TOLS', 'MCS', 'RPI', 'BFR', 'LIF', 'CCS', 'CIP',
-    } | placeholder_keywords
-    for m in re.finditer(r'\b(\w+)\b', sql):
-        w = m.group(1)
-        if w.upper() in keywords:
-            continue
-        if w in tables or w in table_alias_map or w in col_alias_map:
-            continue
-        if re.match(r'^table_alias_placeholder\d+$', w, re.I) or re.match(r'^col_alias_placeholder\d+$', w, re.I):
-            continue
-        if w in ('table_name', 'col_name'):
+
+    # Remaining words: each distinct word is checked once; names already known as tables or
+    # aliases and the placeholder names are removed as one set difference first.
+    words = set(_RE_IDENT.findall(sql))
+    words -= tables
+    words -= table_alias_map.keys()
+    words -= col_alias_map.keys()
+    words -= _PLACEHOLDER_WORDS
+    for w in words:
+        if w.upper() in _KEYWORDS:
             continue
-        if w in ('NUM', 'STR', 'DATE', 'num', 'string', 'date', 'boolean'):
+        if _RE_ALIAS_PLACEHOLDER.match(w):
             continue
         if raw_sql and _is_numeric_token(w):
             continue
@@ -299,60 +415,98 @@ def _apply_identifier_replacements(
     col_alias_map,
     columns,
     alias_to_table=None,
-    schema=None,
+    schema_key=None,
 ) -> str:
     """Apply table alias, column alias, table, and column replacements to already literal-replaced text.
-    If schema is provided (dict (table_name, col_name) -> type), use schema types for columns when possible.
+    If schema_key is provided (_schema_key of a dict (table_name, col_name) -> type), use schema types
+    for columns when possible.
     """
-    out = text
+    # Every rule below replaces whole words, so instead of one re.sub pass per identifier the
+    # rules are listed as (word, replacement) steps in the order they apply and composed into
+    # one word -> final word map; a step sees the output of the steps before it.
+    steps = []
+    qualified = {}  # (qualifier, col) -> (qualifier, type), resolved before the word steps
     # Schema: replace columns with type (num/string/date) when we have (table, col) -> type
     cols_replaced_by_schema = set()
-    if schema and alias_to_table is not None:
+    if schema_key and alias_to_table is not None:
+        schema_by_table, unique_col_type = _schema_index(schema_key)
         # 1) Qualified columns: alias.col -> alias.type, table.col -> table_name.type
         for alias, table in alias_to_table.items():
-            for (t, col), typ in schema.items():
-                if t != table:
-                    continue
-                out = re.sub(r"\b" + re.escape(alias) + r"\." + re.escape(col) + r"\b", alias + "." + typ, out)
+            for col, typ in schema_by_table.get(table, ()):
+                qualified.setdefault((alias, col), (alias, typ))
         for table in tables:
-            for (t, col), typ in schema.items():
-                if t != table:
-                    continue
-                out = re.sub(r"\b" + re.escape(table) + r"\." + re.escape(col) + r"\b", "table_name." + typ, out)
+            for col, typ in schema_by_table.get(table, ()):
+                qualified.setdefault((table, col), ("table_name", typ))
         # 2) Unqualified columns: col -> type when column has unique type across schema
-        col_to_types = {}
-        for (t, c), typ in schema.items():
-            col_to_types.setdefault(c, set()).add(typ)
         for col in sorted(columns, key=len, reverse=True):
-            if col in col_to_types and len(col_to_types[col]) == 1:
-                typ = next(iter(col_to_types[col]))
-                out = re.sub(r"\b" + re.escape(col) + r"\b", typ, out)
+            if col in unique_col_type:
+                steps.append((col, unique_col_type[col]))
                 cols_replaced_by_schema.add(col)
     # Standard replacements
     for alias in sorted(table_alias_map.keys(), key=len, reverse=True):
-        out = re.sub(r"\b" + re.escape(alias) + r"\b", table_alias_map[alias], out)
+        steps.append((alias, table_alias_map[alias]))
     for alias in sorted(col_alias_map.keys(), key=len, reverse=True):
-        out = re.sub(r"\b" + re.escape(alias) + r"\b", col_alias_map[alias], out)
+        steps.append((alias, col_alias_map[alias]))
     for t in sorted(tables, key=len, reverse=True):
         if t in table_alias_map:
             continue
-        out = re.sub(r"\b" + re.escape(t) + r"\b", "table_name", out)
+        steps.append((t, "table_name"))
     for col in sorted(columns, key=len, reverse=True):
-        if col.upper() in ("NUM", "STR", "DATE", "TABLE_NAME", "COL_NAME"):
-            continue
-        if col in ("num", "string", "date", "boolean"):
-            continue
-        if re.match(r"^table_alias_placeholder\d+$", col, re.I) or re.match(r"^col_alias_placeholder\d+$", col, re.I):
-            continue
-        if re.match(r"^table_alias\d+$", col, re.I) or re.match(r"^column_alias\d+$", col, re.I):
+        if col.upper() in _PLACEHOLDER_UPPER or col in _TYPE_WORDS or _RE_ANY_ALIAS_PLACEHOLDER.match(col):
             continue
         if col in col_alias_map:
             continue
-        if schema and col in cols_replaced_by_schema:
+        if schema_key and col in cols_replaced_by_schema:
             continue
-        out = re.sub(r"\." + re.escape(col) + r"\b", ".col_name", out)
-        out = re.sub(r"\b" + re.escape(col) + r"\b", "col_name", out)
-    return out
+        steps.append((col, "col_name"))
+
+    final = {}
+    for word, repl in reversed(steps):
+        final[word] = final.get(repl, repl)
+    word_out = final.get
+
+    if qualified:
+        def repl_qualified(m):
+            chain = m.group()
+            if "." not in chain:
+                return word_out(chain, chain)
+            # Rewrite (qualifier, col) pairs left to right, so the trailing table.col of
+            # schema.table.col is found too; a rewritten pair is not reused by the next one.
+            words = chain.split(".")
+            i = 0
+            while i < len(words) - 1:
+                hit = qualified.get((words[i], words[i + 1]))
+                if hit is None:
+                    i += 1
+                else:
+                    words[i], words[i + 1] = hit
+                    i += 2
+            return ".".join([word_out(w, w) for w in words])
+
+        return _RE_DOTTED_WORDS.sub(repl_qualified, text)
+    if not final:
+        return text
+    return _RE_IDENT.sub(lambda m: word_out(m.group(), m.group()), text)
+
+
+# Separator for joining a query's code segments: identifier replacement only rewrites word
+# characters, so no match can span it and the joined result splits back into the segments.
+_SEGMENT_SEP = "\x00"
+
+
+def _replace_identifiers_in_parts(parts, *args, **kwargs):
+    """_apply_identifier_replacements on each code part, done as one call over the joined parts."""
+    if len(parts) == 1:
+        return [_apply_identifier_replacements(parts[0], *args, **kwargs)]
+    if any(_SEGMENT_SEP in p for p in parts):
+        return [_apply_identifier_replacements(p, *args, **kwargs) for p in parts]
+    return _apply_identifier_replacements(_SEGMENT_SEP.join(parts), *args, **kwargs).split(_SEGMENT_SEP)
+
+
+def _rejoin_segments(segments, code_out):
+    """Put processed code parts back between the comments of segments, in order."""
+    code_parts = iter(code_out)
+    return "".join(text if is_comment else next(code_parts) for is_comment, text in segments)
 
 
 def canonicalize_sql(sql: str, schema=None) -> str:
@@ -360,10 +514,15 @@ def canonicalize_sql(sql: str, schema=None) -> str:
     Canonicalize SQL: replace literals and identifiers with placeholders.
     Preserves exact structure and comments; only replaces identifiers and literals in code.
     If schema is provided (dict (table_name, column_name) -> "num"|"string"|"date"), use schema types for columns.
+    Results are memoized per (sql, schema contents), so repeated queries are canonicalized once.
     """
+    return _canonicalize_sql_cached(sql, _schema_key(schema))
+
+
+@lru_cache(maxsize=65536)
+def _canonicalize_sql_cached(sql: str, schema_key) -> str:
     if not sql or not sql.strip():
         return sql
-
     segments = _split_comments(sql)
     non_comment_text = "".join(t for is_c, t in segments if not is_c)
     if not non_comment_text.strip():
@@ -372,24 +531,18 @@ def canonicalize_sql(sql: str, schema=None) -> str:
     out_flat = _replace_literals(non_comment_text)
     tables, table_alias_map, col_alias_map, columns, alias_to_table = _collect_identifiers_regex(out_flat)
 
-    result = []
-    for is_comment, text in segments:
-        if is_comment:
-            result.append(text)
-        else:
-            seg_out = _replace_literals(text)
-            result.append(
-                _apply_identifier_replacements(
-                    seg_out,
-                    tables,
-                    table_alias_map,
-                    col_alias_map,
-                    columns,
-                    alias_to_table=alias_to_table,
-                    schema=schema,
-                )
-            )
-    return "".join(result)
+    # Without comments the only code part is non_comment_text itself: reuse its literal pass
+    code_parts = [text for is_comment, text in segments if not is_comment]
+    code_out = _replace_identifiers_in_parts(
+        [out_flat] if len(code_parts) == 1 else [_replace_literals(text) for text in code_parts],
+        tables,
+        table_alias_map,
+        col_alias_map,
+        columns,
+        alias_to_table=alias_to_table,
+        schema_key=schema_key,
+    )
+    return _rejoin_segments(segments, code_out)
 
 
 def canonicalize_sql_bird(sql: str, db_id: str = "", schema_by_db: dict = None) -> str:
@@ -397,43 +550,39 @@ def canonicalize_sql_bird(sql: str, db_id: str = "", schema_by_db: dict = None)
     BIRD canonicalization: table_name, col_name; table_alias0, table_alias1, ...; column_alias0, column_alias1, ...;
     literals: num, string, date; for boolean columns in conditions use "boolean".
     Uses variable_list_bird schema: (table, column) -> type (num, string, date, boolean).
+    Results are memoized per (sql, schema of db_id).
     """
+    return _canonicalize_sql_bird_cached(sql, _schema_key((schema_by_db or {}).get(db_id)))
+
+
+@lru_cache(maxsize=65536)
+def _canonicalize_sql_bird_cached(sql: str, schema_key) -> str:
     if not sql or not sql.strip():
         return sql
-
     segments = _split_comments(sql)
     non_comment_text = "".join(t for is_c, t in segments if not is_c)
     if not non_comment_text.strip():
         return sql
 
-    schema = (schema_by_db or {}).get(db_id) or {}
     tables, table_alias_map, col_alias_map, columns, alias_to_table = _collect_identifiers_regex(
         non_comment_text, raw_sql=True
     )
-    boolean_col_refs = _build_boolean_col_refs(schema, tables, alias_to_table)
+    boolean_col_refs = _build_boolean_col_refs(schema_key, tables, alias_to_table)
 
     # BIRD placeholder names: table_alias0, column_alias0 (not table_alias_placeholder0)
     table_alias_map_bird = {a: f"table_alias{i}" for i, a in enumerate(table_alias_map)}
     col_alias_map_bird = {a: f"column_alias{i}" for i, a in enumerate(col_alias_map)}
 
-    result = []
-    for is_comment, text in segments:
-        if is_comment:
-            result.append(text)
-        else:
-            seg_out = _replace_literals_bird(text, boolean_col_refs)
-            result.append(
-                _apply_identifier_replacements(
-                    seg_out,
-                    tables,
-                    table_alias_map_bird,
-                    col_alias_map_bird,
-                    columns,
-                    alias_to_table=alias_to_table,
-                    schema=None,
-                )
-            )
-    return "".join(result)
+    code_out = _replace_identifiers_in_parts(
+        [_replace_literals_bird(text, boolean_col_refs) for is_comment, text in segments if not is_comment],
+        tables,
+        table_alias_map_bird,
+        col_alias_map_bird,
+        columns,
+        alias_to_table=alias_to_table,
+        schema_key=None,
+    )
+    return _rejoin_segments(segments, code_out)
 
 
 def load_schema_csv(schema_path: str):
@@ -459,114 +608,195 @@ def load_schema_csv(schema_path: str):
     return {"movie_platform": schema}
 
 
-def process_bird23_jsonl(input_path: str, output_path: str, schema_by_db: dict = None) -> None:
+# One encoder for all rows: json.dumps builds a new encoder per call when given options.
+# Rows keep json's ", " / ": " separators, so the output is the same with or without orjson.
+_encode_json = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def _loads_json(line: str):
+    """Parse one JSONL row with orjson when available; json handles what orjson rejects (NaN, big ints)."""
+    if HAS_ORJSON:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(line)
+
+
+def _column_getter(header, *names):
+    """Function returning the column of a row for the first of names present in header ("" if none)."""
+    for name in names:
+        if name in header:
+            return itemgetter(header.index(name))
+    return lambda row: ""
+
+
+def _csv_rows(reader, width):
+    """Non-blank rows of a csv.reader as lists, short rows padded with "" to width."""
+    for row in reader:
+        if row:
+            if len(row) < width:
+                row.extend([""] * (width - len(row)))
+            yield row
+
+
+# Per-process schema keys (db_id -> _schema_key) for row canonicalization, set once by
+# _init_canon_worker so rows do not snapshot their schema again.
+_worker_schema_keys = {}
+
+
+def _init_canon_worker(schema_by_db):
+    global _worker_schema_keys
+    _worker_schema_keys = {db_id: _schema_key(schema) for db_id, schema in (schema_by_db or {}).items()}
+
+
+def _map_rows(func, items, schema_by_db, jobs=1):
+    """Yield func(item) for items in input order. func reads the schema from _worker_schema_keys.
+    With jobs > 1 the items are spread over a process pool whose workers receive schema_by_db once."""
+    if jobs <= 1:
+        _init_canon_worker(schema_by_db)
+        yield from map(func, items)
+        return
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_canon_worker, initargs=(schema_by_db,)
+    ) as ex:
+        yield from ex.map(func, items, chunksize=256)
+
+
+def _canonicalize_jsonl_line(line: str):
+    """JSONL row -> output line with canonical_sql (schema for the row's db_id); None for blank lines."""
+    line = line.strip()
+    if not line:
+        return None
+    obj = _loads_json(line)
+    gold = obj.get("SQL", obj.get("sql", ""))
+    db_id = obj.get("db_id", "")
+    obj["canonical_sql"] = _canonicalize_sql_cached(gold, _worker_schema_keys.get(db_id))
+    return _encode_json(obj) + "\n"
+
+
+def _canonicalize_jsonl_line_bird(line: str):
+    """JSONL row -> output line with BIRD canonical_sql; None for blank lines."""
+    line = line.strip()
+    if not line:
+        return None
+    obj = _loads_json(line)
+    gold = obj.get("SQL", obj.get("sql", ""))
+    db_id = obj.get("db_id", "")
+    obj["canonical_sql"] = _canonicalize_sql_bird_cached(gold, _worker_schema_keys.get(db_id))
+    return _encode_json(obj) + "\n"
+
+
+def _canonicalize_bird(gold_and_db_id):
+    gold, db_id = gold_and_db_id
+    return _canonicalize_sql_bird_cached(gold, _worker_schema_keys.get(db_id))
+
+
+def process_bird23_jsonl(input_path: str, output_path: str, schema_by_db: dict = None, jobs: int = 1) -> None:
     """Read JSONL (e.g. bird23-train-filtered), add canonical_sql from SQL field, write JSONL.
     If schema_by_db is provided, e.g. {"movie_platform": schema_dict}, use schema for that db_id.
+    jobs > 1 canonicalizes rows in that many worker processes (same output).
     """
     count = 0
     with open(input_path, "r", encoding="utf-8") as fin, open(output_path, "w", encoding="utf-8") as fout:
-        for line in fin:
-            line = line.strip()
-            if not line:
+        for out_line in _map_rows(_canonicalize_jsonl_line, fin, schema_by_db, jobs):
+            if out_line is None:
                 continue
-            obj = json.loads(line)
-            gold = obj.get("SQL", obj.get("sql", ""))
-            db_id = obj.get("db_id", "")
-            schema = (schema_by_db or {}).get(db_id)
-            obj["canonical_sql"] = canonicalize_sql(gold, schema=schema)
-            fout.write(json.dumps(obj, ensure_ascii=False) + "\n")
+            fout.write(out_line)
             count += 1
     print(f"Wrote {count} rows to {output_path}")
 
 
 def process_bird23_jsonl_bird(
-    input_path: str, output_path: str, variable_list_path: str
+    input_path: str, output_path: str, variable_list_path: str, jobs: int = 1
 ) -> None:
     """
     BIRD canonicalization: read variable_list_bird.csv (database, table_name, column_name, column_type),
     then for each row use canonicalize_sql_bird(SQL, db_id, schema_by_db).
-    Writes JSONL with canonical_sql.
+    Writes JSONL with canonical_sql. jobs > 1 canonicalizes rows in that many worker processes.
     """
     schema_by_db = load_schema_csv(variable_list_path)
     count = 0
     with open(input_path, "r", encoding="utf-8") as fin, open(output_path, "w", encoding="utf-8") as fout:
-        for line in fin:
-            line = line.strip()
-            if not line:
+        for out_line in _map_rows(_canonicalize_jsonl_line_bird, fin, schema_by_db, jobs):
+            if out_line is None:
                 continue
-            obj = json.loads(line)
-            gold = obj.get("SQL", obj.get("sql", ""))
-            db_id = obj.get("db_id", "")
-            obj["canonical_sql"] = canonicalize_sql_bird(gold, db_id=db_id, schema_by_db=schema_by_db)
-            fout.write(json.dumps(obj, ensure_ascii=False) + "\n")
+            fout.write(out_line)
             count += 1
     print(f"Wrote {count} rows to {output_path}")
 
 
 def process_bird23_csv_bird(
-    input_path: str, output_path: str, variable_list_path: str
+    input_path: str, output_path: str, variable_list_path: str, jobs: int = 1
 ) -> None:
     """
     BIRD canonicalization from CSV: read variable_list_bird.csv, then read input CSV (db_id, question, evidence, SQL),
-    add canonical_sql, write output CSV.
+    add canonical_sql, write output CSV. jobs > 1 canonicalizes rows in that many worker processes.
     """
     schema_by_db = load_schema_csv(variable_list_path)
-    with open(input_path, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-        fieldnames = list(reader.fieldnames or []) + ["canonical_sql"]
-    for row in rows:
-        gold = row.get("SQL", row.get("sql", ""))
-        db_id = row.get("db_id", "")
-        row["canonical_sql"] = canonicalize_sql_bird(gold, db_id=db_id, schema_by_db=schema_by_db)
-    with open(output_path, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, quoting=csv.QUOTE_MINIMAL)
-        writer.writeheader()
-        writer.writerows(rows)
-    print(f"Wrote {len(rows)} rows to {output_path}")
+    count = 0
+    with open(input_path, "r", encoding="utf-8") as fin, open(output_path, "w", encoding="utf-8", newline="") as fout:
+        reader = csv.reader(fin)
+        header = next(reader, [])
+        get_sql = _column_getter(header, "SQL", "sql")
+        get_db_id = _column_getter(header, "db_id")
+        rows, rows_for_sql = tee(_csv_rows(reader, len(header)))
+        sql_and_db = ((get_sql(row), get_db_id(row)) for row in rows_for_sql)
+        writer = csv.writer(fout, quoting=csv.QUOTE_MINIMAL)
+        writer.writerow(header + ["canonical_sql"])
+        for row, canonical in zip(rows, _map_rows(_canonicalize_bird, sql_and_db, schema_by_db, jobs)):
+            row.append(canonical)
+            writer.writerow(row)
+            count += 1
+    print(f"Wrote {count} rows to {output_path}")
 
 
 def main():
-    input_path = "livesqlbench-base-lite.csv"
-    output_path = "livesqlbench-base-lite-canonical.csv"
-    if len(sys.argv) > 1:
-        input_path = sys.argv[1]
-    if len(sys.argv) > 2:
-        output_path = sys.argv[2]
+    parser = argparse.ArgumentParser(description="Canonicalize SQL in a BIRD JSONL/CSV or LiveSQLBench CSV file.")
+    parser.add_argument("input_path", nargs="?", default="livesqlbench-base-lite.csv")
+    parser.add_argument("output_path", nargs="?")
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes (default 1; 0 = one per CPU core)")
+    args = parser.parse_args()
+    if args.jobs < 0:
+        parser.error("--jobs must be >= 0")
+    input_path = args.input_path
+    output_path = args.output_path if args.output_path is not None else "livesqlbench-base-lite-canonical.csv"
+    jobs = args.jobs or (os.cpu_count() or 1)
 
     # BIRD (bird23-train-filtered): BIRD canonicalization with variable_list_bird.csv; use CSV if available
     if "bird23" in input_path or (not input_path.endswith(".csv") and "filtered" in input_path):
         base = input_path.rstrip("/").replace(".csv", "")
-        out = output_path if len(sys.argv) > 2 else (base + "-canonical.csv" if input_path.endswith(".csv") else base + "-canonical")
+        out = output_path if args.output_path is not None else (base + "-canonical.csv" if input_path.endswith(".csv") else base + "-canonical")
         csv_in = input_path if input_path.endswith(".csv") else (base + ".csv")
         csv_out = out if out.endswith(".csv") else (out + ".csv")
         use_csv = input_path.endswith(".csv") or os.path.exists(csv_in)
         for var_path in ["BIRD/variable_list_bird.csv", "variable_list_bird.csv"]:
             if os.path.exists(var_path):
                 if use_csv:
-                    process_bird23_csv_bird(csv_in, csv_out, variable_list_path=var_path)
+                    process_bird23_csv_bird(csv_in, csv_out, variable_list_path=var_path, jobs=jobs)
                 else:
-                    process_bird23_jsonl_bird(input_path, out, variable_list_path=var_path)
+                    process_bird23_jsonl_bird(input_path, out, variable_list_path=var_path, jobs=jobs)
                 return
         schema_path = "movie_platform_schema.csv"
         schema_by_db = load_schema_csv(schema_path) if os.path.exists(schema_path) else {}
-        process_bird23_jsonl(input_path, out, schema_by_db=schema_by_db)
+        process_bird23_jsonl(input_path, out, schema_by_db=schema_by_db, jobs=jobs)
         return
 
-    with open(input_path, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-        fieldnames = list(reader.fieldnames) + ["canonical_sql"]
-
-    with open(output_path, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, quoting=csv.QUOTE_MINIMAL)
-        writer.writeheader()
-        for row in rows:
-            gold = row.get("gold_sql", "")
-            row["canonical_sql"] = canonicalize_sql(gold)
+    # LiveSQLBench CSV: canonicalize gold_sql, streaming rows as lists
+    count = 0
+    with open(input_path, "r", encoding="utf-8") as fin, open(output_path, "w", encoding="utf-8", newline="") as fout:
+        reader = csv.reader(fin)
+        header = next(reader)
+        get_gold = _column_getter(header, "gold_sql")
+        rows, rows_for_sql = tee(_csv_rows(reader, len(header)))
+        writer = csv.writer(fout, quoting=csv.QUOTE_MINIMAL)
+        writer.writerow(header + ["canonical_sql"])
+        for row, canonical in zip(rows, _map_rows(canonicalize_sql, map(get_gold, rows_for_sql), None, jobs)):
+            row.append(canonical)
             writer.writerow(row)
+            count += 1
 
-    print(f"Wrote {len(rows)} rows to {output_path}")
+    print(f"Wrote {count} rows to {output_path}")
 
 
 if __name__ == "__main__":